@@ -4,10 +4,8 @@ import pyttsx3
 import spacy
 import subprocess
 import wikipedia
-from googlesearch import search
 import webbrowser
 import requests
-from bs4 import BeautifulSoup
 import pyjokes
 import ollama
 import threading
@@ -19,6 +17,8 @@ import os
 import sys
 import contextlib
 import io
+import web
+import wiki
 
 
 
@@ -237,17 +237,19 @@ def handle_file(text):
 
 # ------------------ Wikipedia Lookup ------------------
 def handle_wikipedia(text):
+    query = text
+    for kw in ["wikipedia", "who", "what", "tell me about"]:
+        query = query.replace(kw, "")
+    query = query.strip()
+    if not query:
+        return "What do you want me to search on Wikipedia?"
     try:
-        query = text
-        for kw in ["wikipedia", "who", "what", "tell me about"]:
-            query = query.replace(kw, "")
-        query = query.strip()
-        if not query:
-            return "What do you want me to search on Wikipedia?"
-        result = wikipedia.summary(query, sentences=2)
-        return result
-    except:
-        return "I couldn't find anything on Wikipedia."
+        result = wiki.summary(query, sentences=2)
+    except wikipedia.exceptions.DisambiguationError as e:
+        return f"{query} could mean {', '.join(e.options[:3])}. Which one do you mean?"
+    except (wikipedia.exceptions.WikipediaException, requests.RequestException):
+        return "I couldn't reach Wikipedia right now."
+    return result or "I couldn't find anything on Wikipedia."
 
 # ------------------ Reminders Lookup ------------------
 def set_reminder():
@@ -318,11 +320,11 @@ def handle_search(text):
         return "What should I search for?"
 
     try:
-        results = list(search(query))
+        results = web.search(query, max_results=web.FETCH_RESULTS)
         if not results:
             return "I couldn't find anything."
 
-        top_result = results[0]
+        top_result = results[0]["href"]
         speak(f"I found some results for {query}. Reading the top result.")
 
 
@@ -330,10 +332,7 @@ def handle_search(text):
 
 
         try:
-            r = requests.get(top_result, timeout=5)
-            soup = BeautifulSoup(r.text, "html.parser")
-            paragraphs = soup.find_all("p")
-            text_content = " ".join([p.get_text() for p in paragraphs[:3]])
+            text_content = " ".join(web.best_passages(query, [r["href"] for r in results]))
             summary = summarize_text(text_content)
             if summary:
                 speak(summary)
@@ -468,11 +467,7 @@ def main():
                         speak(f"Error: {e}")
                 else:
                     
-                    response, classs = ask_ai(user_input)
-                    if (classs == search):
-                        response = polish_response(response)     # <--- extra polish step
-                    else :
-                        pass
+                    response, _ = ask_ai(user_input)
                     speak(response)
 
 if __name__ == "__main__":
@@ -1,153 +1,150 @@
 import datetime
-import speech_recognition as sr
-import pyttsx3
-import spacy
 import subprocess
-import wikipedia
 import requests
 import pyjokes
 import ollama
 import threading
 import time
-from TTS.api import TTS
-import simpleaudio as sa
 import logging
 import os
 import contextlib
-import io
-import pickle
-import shutil
-from duckduckgo_search import DDGS
-from langchain.embeddings import SentenceTransformerEmbeddings
-from langchain.vectorstores import FAISS
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-
-try:
-    import PyPDF2
-    from docx import Document
-except ImportError:
-    os.system("pip install PyPDF2 python-docx")
+import sys
+from concurrent.futures import ThreadPoolExecutor, wait
+import models
+import web
+import wiki
+from asr import WakeWordDetector, create_backend
+from capture import BargeInMonitor, EnergyVAD, MicrophoneStream
+from knowledge import clear_knowledge, ingest_document, load_vector_store, retrieve_context
+from speech import CachedSynthesizer, SpeechPipeline, stream_sentences
 
 # ------------------ Initialization ------------------
-nlp = spacy.load("en_core_web_sm")
-recognizer = sr.Recognizer()
-tts = pyttsx3.init()
-tts.setProperty('rate', 165)
-tts.setProperty('volume', 1.0)
+ASR_BACKEND = os.environ.get("FRIDAY_ASR", "google")
+asr = create_backend(ASR_BACKEND)
+microphone = MicrophoneStream()
+vad = EnergyVAD()
+barge_in_seq = None
+responding = threading.Event()
 WAKE_WORDS = ["friday", "hey friday"]
+wake_detector = WakeWordDetector(WAKE_WORDS)
 thinking_flag = False
-tts_model = TTS(model_name="tts_models/en/ljspeech/tacotron2-DDC", progress_bar=False, gpu=False)
+thinking_thread = None
+STREAM_RESPONSES = True
+CONTEXT_DEADLINE = float(os.environ.get("FRIDAY_CONTEXT_DEADLINE", 2.5))
+retrieval = ThreadPoolExecutor(max_workers=2, thread_name_prefix="retrieval")
+lookups = ThreadPoolExecutor(max_workers=6, thread_name_prefix="lookup")
+CANNED_PHRASES = [
+    "Friday is online. Say 'Friday' to wake me up.",
+    "Yes, I'm listening. What can I do?",
+    "Let me think for a second.",
+    "Hello! How can I assist you today?",
+    "Goodbye!",
+]
+
+class ThreadQuietStream:
+    """sys.stdout/sys.stderr proxy that drops writes only from threads inside suppress_stdout_stderr(),
+    so TTS chatter on the synthesis thread never hides what other threads print meanwhile."""
+    quiet = threading.local()
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def write(self, text):
+        return len(text) if getattr(self.quiet, "active", False) else self.stream.write(text)
+
+    def writelines(self, lines):
+        for line in lines: self.write(line)
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+sys.stdout, sys.stderr = ThreadQuietStream(sys.stdout), ThreadQuietStream(sys.stderr)
 
 @contextlib.contextmanager
 def suppress_stdout_stderr():
-    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
-        yield
+    previous, ThreadQuietStream.quiet.active = getattr(ThreadQuietStream.quiet, "active", False), True
+    try: yield
+    finally: ThreadQuietStream.quiet.active = previous
 
 os.environ['TF_CPP_MIN_LOG_LEVEL'] = '3'
 logging.getLogger('TTS').setLevel(logging.FATAL)
 logging.getLogger('numba').setLevel(logging.WARNING)
 logging.getLogger('torch').setLevel(logging.ERROR)
 
-# ------------------ RAG Setup ------------------
-VECTOR_STORE_PATH = "vector_store/faiss_index"
-EMBEDDING_PATH = "vector_store/embeddings.pkl"
-
-embedding_model = SentenceTransformerEmbeddings(model_name="all-MiniLM-L6-v2")
-text_splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=100)
-vector_store = None
-
-def save_vector_store():
-    if vector_store:
-        os.makedirs(os.path.dirname(VECTOR_STORE_PATH), exist_ok=True)
-        vector_store.save_local(VECTOR_STORE_PATH)
-        with open(EMBEDDING_PATH, "wb") as f:
-            pickle.dump(embedding_model, f)
-        print("✅ Knowledge base saved.")
-
-def load_vector_store():
-    global vector_store, embedding_model
-    if os.path.exists(VECTOR_STORE_PATH) and os.path.exists(EMBEDDING_PATH):
-        with open(EMBEDDING_PATH, "rb") as f:
-            embedding_model = pickle.load(f)
-        vector_store = FAISS.load_local(VECTOR_STORE_PATH, embedding_model, allow_dangerous_deserialization=True)
-        print("✅ Knowledge base loaded.")
-    else:
-        print("ℹ️ No knowledge base found.")
-
-# ------------------ File Reading ------------------
-def read_txt(file): return open(file, "r", encoding="utf-8", errors="ignore").read()
-def read_pdf(file):
-    text = ""
-    with open(file, "rb") as f:
-        pdf = PyPDF2.PdfReader(f)
-        for page in pdf.pages: text += page.extract_text() or ""
-    return text
-def read_docx(file): return "\n".join([p.text for p in Document(file).paragraphs])
-
-def ingest_document(file):
-    global vector_store
-    if not os.path.exists(file): return "File not found."
-    ext = os.path.splitext(file)[1].lower()
-    if ext == ".txt": text = read_txt(file)
-    elif ext == ".pdf": text = read_pdf(file)
-    elif ext == ".docx": text = read_docx(file)
-    else: return "Unsupported file format."
-
-    docs = text_splitter.create_documents([text])
-    vector_store = FAISS.from_documents(docs, embedding_model) if vector_store is None else vector_store.add_documents(docs)
-    save_vector_store()
-    return f"📘 Learned from {os.path.basename(file)}."
-
-def retrieve_context(query, k=3):
-    if not vector_store: return ""
-    results = vector_store.similarity_search(query, k=k)
-    return "\n\n".join([r.page_content for r in results])
-
-def clear_knowledge():
-    global vector_store
-    if os.path.exists("vector_store"): shutil.rmtree("vector_store")
-    vector_store = None
-    return "Knowledge base cleared."
-
 # ------------------ Online Search ------------------
-def web_search(query, num_results=3):
-    """DuckDuckGo Search Fallback."""
+def search_summary(query, num_results=3):
+    return "".join(f"• {r['title']}: {r['body']}\n" for r in web.search(query, num_results))
+
+def search_passages(query, num_results=web.FETCH_RESULTS):
+    """Paragraphs from the top result pages that best match the query. The search itself is shared with
+    search_summary through the web client's cache, so running both costs one request."""
+    results = web.search(query, num_results)
+    return "\n".join(web.best_passages(query, [r["href"] for r in results]))
+
+# ------------------ Context Gathering ------------------
+def gather_context(prompt, deadline=CONTEXT_DEADLINE):
+    """Runs local retrieval, web search, result page passages and Wikipedia at once. Local context is used as soon
+    as it is non-empty; otherwise whatever online lookups finish before the deadline. Lookups still running are abandoned.
+    Local retrieval has its own executor so stalled network calls can never keep it from starting."""
+    end = time.monotonic() + deadline
+    local = retrieval.submit(retrieve_context, prompt)
+    online = [lookups.submit(search_summary, prompt), lookups.submit(search_passages, prompt),
+              lookups.submit(wiki.summary, prompt)]
     try:
-        results = DDGS().text(query, max_results=num_results)
-        summary = ""
-        for r in results:
-            summary += f"• {r['title']}: {r['body']}\n"
-        return summary or "No results found."
-    except Exception as e:
-        return f"Search error: {e}"
+        wait([local], timeout=deadline)
+        if usable(local): return local.result()
+        wait(online, timeout=max(0.0, end - time.monotonic()))
+        return "\n\n".join(f.result().strip() for f in online if usable(f))
+    finally:
+        for future in [local, *online]: future.cancel()
+
+def usable(future):
+    return future.done() and not future.cancelled() and future.exception() is None and bool(future.result())
 
 # ------------------ LLaMA + RAG ------------------
-def ask_llama(prompt):
-    global thinking_flag
-    thinking_flag = True
-    t = threading.Thread(target=show_thinking)
-    t.start()
+def ask_llama(prompt, stream=STREAM_RESPONSES):
+    start_thinking()
+    streaming = False
     try:
-        local_context = retrieve_context(prompt)
-        online_context = web_search(prompt) if not local_context else ""
-        context = (local_context + "\n\n" + online_context).strip()
+        context = gather_context(prompt)
 
         full_prompt = (
             "You are Friday, a factual assistant. Use context below to answer:\n\n"
             f"Context:\n{context}\n\nUser: {prompt}"
         )
+        messages = [
+            {"role": "system", "content": "You are Friday, a precise and polite AI assistant."},
+            {"role": "user", "content": full_prompt}
+        ]
 
-        response = ollama.chat(
-            model="friiday",
-            messages=[
-                {"role": "system", "content": "You are Friday, a precise and polite AI assistant."},
-                {"role": "user", "content": full_prompt}
-            ]
-        )
+        if stream:
+            streaming = True
+            return stream_llama(messages)
+        response = ollama.chat(model="friiday", messages=messages)
         return response['message']['content']
     finally:
-        thinking_flag = False
-        t.join()
+        if not streaming: stop_thinking()
+
+def stream_llama(messages):
+    """Yields tokens as Ollama generates them; the thinking animation stops at the first one."""
+    try:
+        for chunk in ollama.chat(model="friiday", messages=messages, stream=True):
+            stop_thinking()
+            yield chunk['message']['content']
+    finally:
+        stop_thinking()
+
+def start_thinking():
+    global thinking_flag, thinking_thread
+    thinking_flag = True
+    thinking_thread = threading.Thread(target=show_thinking)
+    thinking_thread.start()
+
+def stop_thinking():
+    global thinking_flag
+    if not thinking_flag: return
+    thinking_flag = False
+    thinking_thread.join()
 
 def show_thinking():
     global thinking_flag
@@ -161,19 +158,42 @@ def show_thinking():
     print("\r", end="")
 
 # ------------------ Speak ------------------
+synthesize = CachedSynthesizer(lambda: models.get("tts"), models.TTS_MODEL_NAME, quiet=suppress_stdout_stderr)
+speech = SpeechPipeline(synthesize)
+
 def speak(text):
-    print(f"Friday: {text}")
-    file = "voice.wav"
-    with suppress_stdout_stderr(): tts_model.tts_to_file(text=text, file_path=file)
-    sa.WaveObject.from_wave_file(file).play().wait_done()
+    if isinstance(text, str):
+        if barge_in_seq is not None: return
+        print(f"Friday: {text}")
+        speech.say(text).wait()
+        return
+    generation = speech.generation
+    prefix = "Friday: "
+    try:
+        sentences = stream_sentences(text) if barge_in_seq is None else []
+        for sentence in sentences:
+            if barge_in_seq is not None or speech.generation != generation: break
+            print(prefix + sentence, end=" ", flush=True)
+            prefix = ""
+            speech.feed(sentence)
+    finally:
+        text.close()
+        stop_thinking()
+    print()
+    speech.end().wait()
+
+def on_barge_in(start_seq):
+    """The user talked over Friday: stop playback and queued speech, and let the next listen() pick up from start_seq."""
+    global barge_in_seq
+    barge_in_seq = start_seq
+    speech.cancel()
 
 # ------------------ Listen ------------------
 def listen(timeout=None):
-    with sr.Microphone() as src:
-        try:
-            audio = recognizer.listen(src, timeout=timeout)
-            return recognizer.recognize_google(audio).lower()
-        except: return ""
+    global barge_in_seq
+    start, barge_in_seq = barge_in_seq, None
+    pcm = vad.segment(microphone.reader(start), timeout=timeout)
+    return asr.transcribe(pcm) if pcm else ""
 
 # ------------------ Intent Handling ------------------
 def classify_intent(text):
@@ -203,6 +223,12 @@ def ask_ai(prompt):
 
 # ------------------ Wake Word ------------------
 def listen_for_wake_word():
+    global barge_in_seq
+    barge_in_seq = None
+    if wake_detector.available():
+        wake_detector.wait(microphone.reader())
+        speak("Yes, I'm listening. What can I do?")
+        return True
     while True:
         text = listen(timeout=3)
         if any(w in text for w in WAKE_WORDS):
@@ -211,7 +237,13 @@ def listen_for_wake_word():
 
 # ------------------ Main ------------------
 def main():
-    load_vector_store()
+    models.warm("tts", "embeddings", "vosk")
+    threading.Thread(target=load_vector_store, daemon=True).start()
+    threading.Thread(target=synthesize.warm, args=(CANNED_PHRASES,), daemon=True).start()
+    microphone.start()
+    vad.calibrate(microphone.reader())
+    BargeInMonitor(microphone, lambda: responding.is_set() and speech.playing.is_set(), on_barge_in,
+                   noise_floor=vad.noise_floor).start()
     speak("Friday is online. Say 'Friday' to wake me up.")
     while True:
         if listen_for_wake_word():
@@ -222,7 +254,9 @@ def main():
                     speak("Goodbye!")
                     return
                 response, _ = ask_ai(user_input)
-                speak(response)
+                responding.set()
+                try: speak(response)
+                finally: responding.clear()
 
 if __name__ == "__main__":
     main()
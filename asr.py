@@ -0,0 +1,100 @@
+import json
+import numpy as np
+import soxr
+import speech_recognition as sr
+import models
+
+SAMPLE_RATE = 16000
+
+# ------------------ Resampling ------------------
+class Resampler:
+    """Streaming int16 PCM rate conversion. Filter state carries across calls, so block-by-block input
+    has no edge transients; pass last=True with the final block to flush the filter delay."""
+
+    def __init__(self, src_rate, dst_rate=SAMPLE_RATE):
+        same = int(src_rate) == int(dst_rate)
+        self.stream = None if same else soxr.ResampleStream(src_rate, dst_rate, 1, dtype="int16")
+
+    def __call__(self, pcm, last=False):
+        if self.stream is None: return pcm
+        return self.stream.resample_chunk(np.frombuffer(pcm, dtype=np.int16), last=last).tobytes()
+
+# ------------------ Backends ------------------
+class ASRBackend:
+    """Turns 16-bit mono PCM into lowercase text."""
+
+    def transcribe(self, pcm, sample_rate=SAMPLE_RATE):
+        raise NotImplementedError
+
+    def stream(self, chunks, sample_rate=SAMPLE_RATE):
+        """Yields (is_final, text) pairs; backends without partial results emit one final transcript."""
+        text = self.transcribe(b"".join(chunks), sample_rate)
+        if text: yield True, text
+
+class GoogleASR(ASRBackend):
+    def __init__(self, recognizer=None):
+        self.recognizer = recognizer or sr.Recognizer()
+
+    def transcribe(self, pcm, sample_rate=SAMPLE_RATE):
+        try: return self.recognizer.recognize_google(sr.AudioData(pcm, sample_rate, 2)).lower()
+        except (sr.UnknownValueError, sr.RequestError): return ""
+
+class VoskASR(ASRBackend):
+    def __init__(self, load_model=lambda: models.get("vosk")):
+        self.load_model = load_model
+
+    def recognizer(self):
+        import vosk
+        return vosk.KaldiRecognizer(self.load_model(), SAMPLE_RATE)
+
+    def stream(self, chunks, sample_rate=SAMPLE_RATE):
+        rec = self.recognizer()
+        resample = Resampler(sample_rate)
+        last_partial = ""
+        for chunk in chunks:
+            if rec.AcceptWaveform(resample(chunk)):
+                text = json.loads(rec.Result()).get("text", "")
+                last_partial = ""
+                if text: yield True, text
+            else:
+                partial = json.loads(rec.PartialResult()).get("partial", "")
+                if partial and partial != last_partial:
+                    last_partial = partial
+                    yield False, partial
+        rec.AcceptWaveform(resample(b"", last=True))
+        text = json.loads(rec.FinalResult()).get("text", "")
+        if text: yield True, text
+
+    def transcribe(self, pcm, sample_rate=SAMPLE_RATE):
+        return " ".join(text for final, text in self.stream([pcm], sample_rate) if final).lower()
+
+# ------------------ Wake Word ------------------
+class WakeWordDetector:
+    """Keyword spotter: a Vosk recognizer constrained to the wake phrases, run frame by frame."""
+
+    def __init__(self, wake_words, load_model=lambda: models.get("vosk")):
+        self.wake_words = wake_words
+        self.grammar = json.dumps(list(wake_words) + ["[unk]"])
+        self.load_model = load_model
+
+    def available(self):
+        try:
+            self.load_model()
+            return True
+        except Exception:
+            return False
+
+    def wait(self, reader):
+        import vosk
+        rec = vosk.KaldiRecognizer(self.load_model(), SAMPLE_RATE, self.grammar)
+        while True:
+            frame = reader.read()
+            if rec.AcceptWaveform(frame): text = json.loads(rec.Result()).get("text", "")
+            else: text = json.loads(rec.PartialResult()).get("partial", "")
+            if any(w in text for w in self.wake_words): return True
+
+BACKENDS = {"google": GoogleASR, "vosk": VoskASR}
+
+def create_backend(name, **kwargs):
+    if name not in BACKENDS: raise ValueError(f"Unknown ASR backend '{name}', expected one of {sorted(BACKENDS)}")
+    return BACKENDS[name](**kwargs)
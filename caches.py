@@ -0,0 +1,140 @@
+import os
+import time
+import threading
+import contextlib
+from collections import OrderedDict
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# ------------------ LRU Cache ------------------
+class LRUCache:
+    """Thread-safe LRU mapping with hit/miss counters."""
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key]
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock: self.entries.clear()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {"entries": len(self.entries), "hits": self.hits, "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0}
+
+class TTLCache(LRUCache):
+    """LRUCache whose entries expire ttl seconds after they were stored."""
+
+    def __init__(self, max_entries=256, ttl=600):
+        super().__init__(max_entries)
+        self.ttl = ttl
+
+    def get(self, key, default=None):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry and entry[0] > time.monotonic():
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.entries.pop(key, None)
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        super().put(key, (time.monotonic() + self.ttl, value))
+
+# ------------------ Embedding Cache ------------------
+class EmbeddingCache:
+    """Persistent float32 vectors keyed by 32-byte digests. keys.bin and vectors.f32 only ever grow,
+    and reads go through a memory map of the vector file. Appends hold an exclusive flock on cache.lock
+    and first pick up rows other processes wrote, so several processes can share one directory."""
+
+    KEY_SIZE = 32
+
+    def __init__(self, directory, dimension):
+        self.directory = directory
+        self.dimension = dimension
+        self.keys_path = os.path.join(directory, "keys.bin")
+        self.vectors_path = os.path.join(directory, "vectors.f32")
+        self.lock_path = os.path.join(directory, "cache.lock")
+        self.rows = {}
+        self.count = 0
+        self.matrix = None
+        self.lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        with self.locked(): self.sync()
+
+    @contextlib.contextmanager
+    def locked(self):
+        """Thread lock plus an exclusive file lock (no cross-process locking where fcntl is unavailable)."""
+        with self.lock, open(self.lock_path, "a") as f:
+            if fcntl: fcntl.flock(f, fcntl.LOCK_EX)
+            try: yield
+            finally:
+                if fcntl: fcntl.flock(f, fcntl.LOCK_UN)
+
+    def sync(self):
+        """Reads keys appended since the last sync and truncates a torn tail; call with the file lock held.
+        Vectors are written before keys, so a crashed append can only leave extra vector rows behind."""
+        size = lambda path: os.path.getsize(path) if os.path.exists(path) else 0
+        count = min(size(self.keys_path) // self.KEY_SIZE, size(self.vectors_path) // (4 * self.dimension))
+        if count > self.count:
+            with open(self.keys_path, "rb") as f:
+                f.seek(self.count * self.KEY_SIZE)
+                keys = f.read((count - self.count) * self.KEY_SIZE)
+            for n in range(count - self.count):
+                self.rows.setdefault(keys[n * self.KEY_SIZE:(n + 1) * self.KEY_SIZE], self.count + n)
+            self.count = count
+        self.truncate(self.count)
+
+    def truncate(self, count):
+        with open(self.keys_path, "ab") as f: f.truncate(count * self.KEY_SIZE)
+        with open(self.vectors_path, "ab") as f: f.truncate(count * 4 * self.dimension)
+
+    def get_many(self, keys):
+        with self.lock:
+            if self.matrix is None or len(self.matrix) != self.count:
+                self.matrix = np.memmap(self.vectors_path, dtype=np.float32, mode="r",
+                                        shape=(self.count, self.dimension)) if self.count else None
+            return {key: np.array(self.matrix[self.rows[key]]) for key in keys if key in self.rows}
+
+    def put_many(self, keys, vectors):
+        with self.locked():
+            self.sync()
+            fresh = {}
+            for key, vector in zip(keys, vectors):
+                if key not in self.rows: fresh[key] = vector
+            if not fresh: return
+            with open(self.vectors_path, "ab") as f: np.asarray(list(fresh.values()), dtype=np.float32).tofile(f)
+            with open(self.keys_path, "ab") as f: f.write(b"".join(fresh))
+            for n, key in enumerate(fresh): self.rows[key] = self.count + n
+            self.count += len(fresh)
+
+    def __len__(self):
+        return len(self.rows)
@@ -0,0 +1,169 @@
+import threading
+from collections import deque
+import numpy as np
+import sounddevice as sd
+from asr import SAMPLE_RATE, Resampler
+
+FRAME_MS = 30
+
+# ------------------ Capture Service ------------------
+class MicrophoneStream:
+    """Keeps one input stream open and writes fixed-size 16 kHz int16 frames into a ring buffer."""
+
+    def __init__(self, device=None, frame_ms=FRAME_MS, buffer_seconds=30):
+        self.device = device
+        self.frame_ms = frame_ms
+        self.frame_samples = SAMPLE_RATE * frame_ms // 1000
+        self.frame_bytes = self.frame_samples * 2
+        self.frames = deque(maxlen=buffer_seconds * 1000 // frame_ms)
+        self.next_seq = 0
+        self.pending = b""
+        self.cond = threading.Condition()
+        self.stream = None
+
+    def start(self):
+        if self.stream: return self
+        rate = SAMPLE_RATE
+        if not self.supports(rate): rate = int(sd.query_devices(self.device, 'input')['default_samplerate'])
+        self.resample = Resampler(rate)
+        self.stream = sd.RawInputStream(samplerate=rate, blocksize=rate * self.frame_ms // 1000, dtype='int16',
+                                        channels=1, device=self.device, callback=self._callback)
+        self.stream.start()
+        return self
+
+    def supports(self, rate):
+        """Opening the device at 16 kHz avoids resampling entirely when the driver allows it."""
+        try:
+            sd.check_input_settings(device=self.device, samplerate=rate, channels=1, dtype='int16')
+            return True
+        except (sd.PortAudioError, ValueError):
+            return False
+
+    def stop(self):
+        if self.stream:
+            self.stream.stop()
+            self.stream.close()
+            self.stream = None
+
+    def _callback(self, indata, frames, time, status):
+        self.pending += self.resample(bytes(indata))
+        with self.cond:
+            while len(self.pending) >= self.frame_bytes:
+                self.frames.append(self.pending[:self.frame_bytes])
+                self.pending = self.pending[self.frame_bytes:]
+                self.next_seq += 1
+            self.cond.notify_all()
+
+    def read_frame(self, seq, timeout=None):
+        """Returns (seq, frame) for the frame at seq, skipping ahead if it already fell out of the buffer."""
+        with self.cond:
+            if not self.cond.wait_for(lambda: self.next_seq > seq, timeout): return seq, None
+            oldest = self.next_seq - len(self.frames)
+            seq = max(seq, oldest)
+            return seq, self.frames[seq - oldest]
+
+    def reader(self, start=None):
+        return FrameReader(self, self.next_seq if start is None else start)
+
+class FrameReader:
+    """A listener's cursor into the ring buffer."""
+
+    def __init__(self, mic, seq):
+        self.mic = mic
+        self.seq = seq
+
+    def read(self, timeout=None):
+        seq, frame = self.mic.read_frame(self.seq, timeout)
+        if frame is not None: self.seq = seq + 1
+        return frame
+
+# ------------------ Voice Activity Detection ------------------
+class EnergyVAD:
+    """Energy VAD with an adaptive noise floor, hangover and pre-roll; emits one speech segment at a time.
+    The floor follows non-speech frames; if every frame for floor_window_ms counts as speech, the ambient level
+    has risen (a fan turned on) and the floor jumps to the quietest of those frames."""
+
+    def __init__(self, frame_ms=FRAME_MS, ratio=3.0, min_energy=100.0, adapt=0.05,
+                 hangover_ms=600, preroll_ms=300, min_speech_ms=150, max_seconds=15, floor_window_ms=3000):
+        self.frame_ms = frame_ms
+        self.ratio = ratio
+        self.min_energy = min_energy
+        self.adapt = adapt
+        self.noise_floor = min_energy
+        self.hangover_frames = hangover_ms // frame_ms
+        self.preroll_frames = preroll_ms // frame_ms
+        self.min_speech_frames = min_speech_ms // frame_ms
+        self.max_frames = max_seconds * 1000 // frame_ms
+        self.loud = deque(maxlen=floor_window_ms // frame_ms)
+
+    @staticmethod
+    def energy(frame):
+        samples = np.frombuffer(frame, dtype=np.int16).astype(np.float32)
+        return float(np.sqrt(np.mean(samples * samples))) if samples.size else 0.0
+
+    def threshold(self):
+        return max(self.min_energy, self.noise_floor * self.ratio)
+
+    def is_speech(self, frame):
+        energy = self.energy(frame)
+        if energy > self.threshold():
+            self.loud.append(energy)
+            if len(self.loud) == self.loud.maxlen:
+                self.noise_floor = min(self.loud)
+                self.loud.clear()
+            return True
+        self.loud.clear()
+        self.noise_floor += self.adapt * (energy - self.noise_floor)
+        return False
+
+    def calibrate(self, reader, seconds=0.5):
+        energies = [self.energy(reader.read()) for _ in range(int(seconds * 1000 // self.frame_ms))]
+        if energies: self.noise_floor = max(sum(energies) / len(energies), 1.0)
+
+    def segment(self, reader, timeout=None):
+        """Returns the PCM of the next utterance with its pre-roll, or b"" if none starts within timeout seconds."""
+        preroll = deque(maxlen=self.preroll_frames)
+        voiced, waited, speech, silence = [], 0, 0, 0
+        while True:
+            frame = reader.read()
+            if not voiced:
+                if self.is_speech(frame):
+                    voiced, speech, silence = list(preroll) + [frame], 1, 0
+                    continue
+                preroll.append(frame)
+                waited += 1
+                if timeout and waited * self.frame_ms >= timeout * 1000: return b""
+                continue
+            voiced.append(frame)
+            if self.is_speech(frame): speech, silence = speech + 1, 0
+            else: silence += 1
+            if silence >= self.hangover_frames or len(voiced) >= self.max_frames:
+                if speech >= self.min_speech_frames: return b"".join(voiced)
+                preroll.extend(voiced)
+                voiced = []
+
+# ------------------ Barge-in ------------------
+class BargeInMonitor:
+    """Keeps a VAD running on the stream and calls on_barge_in(start_seq) when speech starts while is_active().
+    Pass the calibrated listening VAD's noise_floor, since the monitor starts while Friday may already be talking."""
+
+    def __init__(self, mic, is_active, on_barge_in, vad=None, noise_floor=None):
+        self.mic = mic
+        self.is_active = is_active
+        self.on_barge_in = on_barge_in
+        self.vad = vad or EnergyVAD(ratio=6.0)
+        if noise_floor: self.vad.noise_floor = noise_floor
+
+    def start(self):
+        threading.Thread(target=self._run, daemon=True).start()
+        return self
+
+    def _run(self):
+        reader = self.mic.reader()
+        run = 0
+        while True:
+            voiced = self.vad.is_speech(reader.read())
+            run = run + 1 if voiced and self.is_active() else 0
+            if run >= self.vad.min_speech_frames:
+                self.on_barge_in(reader.seq - run - self.vad.preroll_frames)
+                run = 0
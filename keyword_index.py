@@ -0,0 +1,85 @@
+import re
+import json
+import math
+import heapq
+from collections import Counter, defaultdict
+
+# ------------------ Tokenizer ------------------
+# Keeps identifiers like "ab-1234/x" or "v2.3.1" whole and also indexes their parts.
+TOKEN_PATTERN = re.compile(r"\w+(?:[-./]\w+)*")
+SEPARATORS = re.compile(r"[-./]")
+STOP_WORDS = frozenset("""a about above after again all am an and any are as at be because been before being below
+between both but by can could did do does doing down during each few for from further had has have having he her
+here hers him his how i if in into is it its itself just me more most my no nor not now of off on once only or other
+our ours out over own same she should so some such than that the their them then there these they this those through
+to too under until up very was we were what when where which while who whom why will with would you your""".split())
+MAX_DOC_RATIO = 0.5
+MIN_CAPPED_DOCS = 1000
+
+def tokenize(text):
+    tokens = []
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        tokens.append(token)
+        if SEPARATORS.search(token): tokens.extend(part for part in SEPARATORS.split(token) if part)
+    return tokens
+
+# ------------------ BM25 ------------------
+class BM25Index:
+    """Okapi BM25 over an in-memory inverted index of term -> {doc_id: term frequency}."""
+
+    def __init__(self, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings = {}
+        self.lengths = {}
+        self.total_length = 0
+
+    def add(self, doc_id, text):
+        if doc_id in self.lengths: return
+        terms = Counter(tokenize(text))
+        for term, count in terms.items(): self.postings.setdefault(term, {})[doc_id] = count
+        self.lengths[doc_id] = sum(terms.values())
+        self.total_length += self.lengths[doc_id]
+
+    def remove(self, doc_id, text):
+        if doc_id not in self.lengths: return
+        for term in set(tokenize(text)):
+            posting = self.postings.get(term)
+            if posting is None: continue
+            posting.pop(doc_id, None)
+            if not posting: del self.postings[term]
+        self.total_length -= self.lengths.pop(doc_id)
+
+    def search(self, query, k=10):
+        """Returns up to k (doc_id, score) pairs, best first. Stop words are skipped. In indexes of at least
+        MIN_CAPPED_DOCS documents, terms found in more than MAX_DOC_RATIO of them are skipped too, unless that
+        would leave no query term: their posting lists are the ones that make a query walk nearly every document."""
+        if not self.lengths: return []
+        n, average = len(self.lengths), self.total_length / len(self.lengths) or 1.0
+        terms = {term for term in set(tokenize(query)) - STOP_WORDS if term in self.postings}
+        if n >= MIN_CAPPED_DOCS:
+            common = {term for term in terms if len(self.postings[term]) > MAX_DOC_RATIO * n}
+            if common != terms: terms -= common
+        scores = defaultdict(float)
+        for term in terms:
+            posting = self.postings[term]
+            idf = math.log(1 + (n - len(posting) + 0.5) / (len(posting) + 0.5))
+            for doc_id, tf in posting.items():
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[doc_id] / average)
+                scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+        return heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+
+    def __len__(self):
+        return len(self.lengths)
+
+    def save(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"lengths": self.lengths, "postings": self.postings}, f)
+
+    @classmethod
+    def load(cls, path):
+        index = cls()
+        with open(path, encoding="utf-8") as f: data = json.load(f)
+        index.lengths, index.postings = data["lengths"], data["postings"]
+        index.total_length = sum(index.lengths.values())
+        return index
@@ -0,0 +1,629 @@
+import os
+import json
+import shutil
+import hashlib
+import argparse
+import contextlib
+import threading
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import faiss
+import numpy as np
+from langchain.vectorstores import FAISS
+from langchain.docstore.in_memory import InMemoryDocstore
+from langchain.docstore.document import Document as Chunk
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+import models
+from caches import EmbeddingCache, LRUCache
+from keyword_index import BM25Index
+from vector_index import INDEX_TYPE, MMAP_INDEX, benchmark, build_index, configure, desired_kind, index_kind, read_index
+
+try:
+    import PyPDF2
+    from docx import Document
+except ImportError:
+    os.system("pip install PyPDF2 python-docx")
+
+# ------------------ RAG Setup ------------------
+VECTOR_STORE_DIR = "vector_store"
+MANIFEST_PATH = os.path.join(VECTOR_STORE_DIR, "manifest.json")
+LEGACY_INDEX_PATH = os.path.join(VECTOR_STORE_DIR, "faiss_index")
+LEGACY_EMBEDDING_PATH = os.path.join(VECTOR_STORE_DIR, "embeddings.pkl")
+FILE_INDEX_PATH = os.path.join(VECTOR_STORE_DIR, "files.json")
+EMBEDDING_CACHE_DIR = os.path.join("cache", "embeddings", models.EMBEDDING_MODEL_NAME)
+STORE_VERSION = 2
+COMPACT_SEGMENTS = 32
+COMPACT_RATIO = 0.25
+FUSION_CANDIDATES = 20
+RRF_K = 60
+RETRIEVE_K = 8
+MIN_SIMILARITY = float(os.environ.get("FRIDAY_MIN_SIMILARITY", 0.3))
+KEYWORD_PASS_RANK = 3
+KEYWORD_PASS_RATIO = 0.5
+CONTEXT_TOKENS = int(os.environ.get("FRIDAY_CONTEXT_TOKENS", 600))
+CHUNK_SIZE = 500
+CHUNK_OVERLAP = 100
+MIN_OVERLAP = 20
+
+text_splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+vector_store = None
+manifest = None
+file_index = {}
+embedding_cache = None
+query_embeddings = LRUCache(512)
+retrieval_results = LRUCache(256)
+store_generation = 0
+tombstones = set()
+keyword_index = BM25Index()
+mapped_index_path = None
+open_segment = None
+store_loaded = threading.Event()
+
+# ------------------ Persistence ------------------
+# The store is a base snapshot (base-N.faiss + base-N.jsonl + base-N.bm25.json) plus append-only delta segments
+# (seg-N.f32 vectors + seg-N.jsonl deletions and chunk records) listed in manifest.json, which is replaced atomically.
+# An ingest run appends all of its batches to one open segment; manifest["segment_rows"] records how many records of
+# each segment are committed, so a torn append is ignored on load. Segments written before that are seg-N.npy.
+def store_path(name): return os.path.join(VECTOR_STORE_DIR, name)
+
+def base_paths(name):
+    if name is None: return store_path("index.faiss"), store_path("docstore.jsonl")
+    return store_path(f"base-{name}.faiss"), store_path(f"base-{name}.jsonl")
+
+def keyword_path(name): return store_path("keywords.bm25.json" if name is None else f"base-{name}.bm25.json")
+
+def segment_paths(name): return store_path(f"seg-{name}.f32"), store_path(f"seg-{name}.jsonl")
+
+def legacy_segment_path(name): return store_path(f"seg-{name}.npy")
+
+def next_name(): return f"{(manifest or {}).get('next_id', 1):06d}"
+
+def write_json(path, data):
+    with open(path + ".tmp", "w", encoding="utf-8") as f: json.dump(data, f)
+    os.replace(path + ".tmp", path)
+
+def write_records(path, rows):
+    with open(path, "w", encoding="utf-8") as f:
+        for doc_id, text, metadata in rows:
+            f.write(json.dumps({"id": doc_id, "text": text, "metadata": metadata}) + "\n")
+
+def read_segment(path, rows=None):
+    deleted, ids, texts, metadatas = [], [], [], []
+    with open(path, encoding="utf-8") as f:
+        for n, line in enumerate(f):
+            if rows is not None and n >= rows: break
+            row = json.loads(line)
+            if "delete" in row:
+                deleted.append(row["delete"])
+                continue
+            ids.append(row["id"])
+            texts.append(row["text"])
+            metadatas.append(row["metadata"])
+    return deleted, ids, texts, metadatas
+
+def read_segment_vectors(name, count, dimension):
+    if os.path.exists(legacy_segment_path(name)): return np.load(legacy_segment_path(name))
+    return np.fromfile(segment_paths(name)[0], dtype=np.float32, count=count * dimension).reshape(count, dimension)
+
+def read_records(path, ids, docs):
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            row = json.loads(line)
+            ids.append(row["id"])
+            docs[row["id"]] = Chunk(page_content=row["text"], metadata=row["metadata"])
+
+def save_vector_store():
+    """Compacts into a fresh base snapshot, rebuilding the index first if it holds deleted chunks or is the wrong type."""
+    if not vector_store: return
+    if tombstones or index_kind(vector_store.index) != desired_kind(live_count(), requested_index_type()):
+        reindex()
+    else:
+        write_base()
+
+def write_base(index_type=None):
+    """Writes the base snapshot and drops the delta segments; the embedding model itself is never persisted."""
+    global manifest, mapped_index_path
+    os.makedirs(VECTOR_STORE_DIR, exist_ok=True)
+    old, name = manifest, next_name()
+    index_path, docstore_path = base_paths(name)
+    faiss.write_index(vector_store.index, index_path)
+    if mapped_index_path: mapped_index_path = index_path
+    docstore_rows = []
+    for i in range(vector_store.index.ntotal):
+        doc_id = vector_store.index_to_docstore_id[i]
+        doc = vector_store.docstore.search(doc_id)
+        docstore_rows.append((doc_id, doc.page_content, doc.metadata))
+    write_records(docstore_path, docstore_rows)
+    keyword_index.save(keyword_path(name))
+    manifest = {
+        "version": STORE_VERSION,
+        "model": models.EMBEDDING_MODEL_NAME,
+        "dimension": vector_store.index.d,
+        "count": vector_store.index.ntotal,
+        "base": name,
+        "base_count": vector_store.index.ntotal,
+        "segments": [],
+        "segment_rows": {},
+        "delta_rows": 0,
+        "next_id": int(name) + 1,
+        "index_type": index_type or (old or {}).get("index_type", "auto"),
+    }
+    write_json(MANIFEST_PATH, manifest)
+    if old:
+        stale = [*base_paths(old.get("base")), keyword_path(old.get("base"))]
+        for seg in old.get("segments", []): stale.extend([*segment_paths(seg), legacy_segment_path(seg)])
+        for path in stale:
+            if os.path.exists(path): os.remove(path)
+    print("✅ Knowledge base saved.")
+
+def append_segment(deleted, ids, texts, metadatas, vectors):
+    """Persists removed and newly added chunks as a delta segment, or appends them to the open segment of an
+    ingest run. Outside a run, compacts into the base once deltas pile up."""
+    global manifest
+    if manifest is None: return save_vector_store()
+    name = open_segment or next_name()
+    listed = name in manifest["segments"]
+    mode = "a" if listed else "w"
+    vectors_path, records_path = segment_paths(name)
+    with open(vectors_path, mode + "b") as f: np.asarray(vectors, dtype=np.float32).reshape(-1, vector_store.index.d).tofile(f)
+    with open(records_path, mode, encoding="utf-8") as f:
+        for doc_id in deleted: f.write(json.dumps({"delete": doc_id}) + "\n")
+        for doc_id, text, metadata in zip(ids, texts, metadatas):
+            f.write(json.dumps({"id": doc_id, "text": text, "metadata": metadata}) + "\n")
+    rows = manifest.get("segment_rows", {})
+    manifest = {**manifest, "count": vector_store.index.ntotal,
+                "segments": manifest["segments"] if listed else manifest["segments"] + [name],
+                "segment_rows": {**rows, name: rows.get(name, 0) + len(deleted) + len(ids)},
+                "delta_rows": manifest.get("delta_rows", 0) + len(deleted) + len(ids),
+                "next_id": max(manifest["next_id"], int(name) + 1)}
+    write_json(MANIFEST_PATH, manifest)
+    if open_segment is None: compact_if_due()
+
+def compact_if_due():
+    """Compacts into a fresh base once delta segments pile up or the index should switch type."""
+    if vector_store is None or manifest is None: return
+    due = (len(manifest["segments"]) >= COMPACT_SEGMENTS or
+           manifest.get("delta_rows", 0) > COMPACT_RATIO * manifest["base_count"])
+    if due or index_kind(vector_store.index) != desired_kind(live_count(), requested_index_type()): save_vector_store()
+
+@contextlib.contextmanager
+def segment_run():
+    """Commits inside the block share one delta segment; compaction and index switch-over wait until it ends."""
+    global open_segment
+    open_segment = next_name()
+    try: yield
+    finally:
+        open_segment = None
+        compact_if_due()
+
+def load_vector_store(mmap=MMAP_INDEX):
+    """Loads the store and then sets store_loaded, which ingestion, clearing and rebuilds wait for so they never
+    start from an empty store and overwrite the one still loading."""
+    try: read_vector_store(mmap)
+    finally: store_loaded.set()
+
+def read_vector_store(mmap):
+    """With mmap the base index is mapped read-only instead of read into RAM, unless segments must be replayed onto it."""
+    global vector_store, manifest, mapped_index_path, keyword_index
+    if os.path.exists(MANIFEST_PATH):
+        with open(MANIFEST_PATH, encoding="utf-8") as f: stored = json.load(f)
+        if stored["model"] != models.EMBEDDING_MODEL_NAME:
+            print(f"⚠️ Knowledge base was built with {stored['model']}; re-ingest to use {models.EMBEDDING_MODEL_NAME}.")
+            return
+        index_path, docstore_path = base_paths(stored.get("base"))
+        index, mapped = read_index(index_path, mmap and not stored.get("segments"))
+        mapped_index_path = index_path if mapped else None
+        ids, docs = [], {}
+        read_records(docstore_path, ids, docs)
+        vector_store = FAISS(models.get("embeddings"), index, InMemoryDocstore(docs), dict(enumerate(ids)))
+        keyword_index = load_keyword_index(keyword_path(stored.get("base")), docs)
+        tombstones.clear()
+        for seg in stored.get("segments", []):
+            deleted, seg_ids, texts, metadatas = read_segment(segment_paths(seg)[1], stored.get("segment_rows", {}).get(seg))
+            vectors = read_segment_vectors(seg, len(seg_ids), index.d) if seg_ids else []
+            apply_changes(deleted, seg_ids, texts, metadatas, vectors)
+        manifest = {"base_count": stored["count"], "segments": [], **stored}
+        load_file_index()
+        invalidate_retrieval_cache()
+        print("✅ Knowledge base loaded.")
+    elif os.path.exists(LEGACY_INDEX_PATH):
+        vector_store = FAISS.load_local(LEGACY_INDEX_PATH, models.get("embeddings"), allow_dangerous_deserialization=True)
+        keyword_index = load_keyword_index(None, vector_store.docstore._dict)
+        save_vector_store()
+        shutil.rmtree(LEGACY_INDEX_PATH)
+        if os.path.exists(LEGACY_EMBEDDING_PATH): os.remove(LEGACY_EMBEDDING_PATH)
+        print("✅ Knowledge base migrated to the manifest format.")
+    else:
+        print("ℹ️ No knowledge base found.")
+
+def load_keyword_index(path, docs):
+    """Reads the BM25 snapshot, or indexes the docstore when the base predates it."""
+    if path and os.path.exists(path): return BM25Index.load(path)
+    index = BM25Index()
+    for doc_id, doc in docs.items(): index.add(doc_id, doc.page_content)
+    return index
+
+# ------------------ File Reading ------------------
+SUPPORTED_EXTENSIONS = (".txt", ".pdf", ".docx")
+EMBED_BATCH_SIZE = 256
+PARSE_WINDOW = 2
+
+def read_txt(file): return open(file, "r", encoding="utf-8", errors="ignore").read()
+def read_pdf(file):
+    with open(file, "rb") as f:
+        pdf = PyPDF2.PdfReader(f)
+        for number, page in enumerate(pdf.pages, 1): yield number, page.extract_text() or ""
+def read_docx(file): return "\n".join([p.text for p in Document(file).paragraphs])
+
+def read_pages(file):
+    """Yields (page number or None, text) so large PDFs never have to be held as one string."""
+    ext = os.path.splitext(file)[1].lower()
+    if ext == ".txt": yield None, read_txt(file)
+    elif ext == ".pdf": yield from read_pdf(file)
+    elif ext == ".docx": yield None, read_docx(file)
+    else: raise ValueError("Unsupported file format.")
+
+def iter_chunks(file):
+    for page, text in read_pages(file):
+        metadata = {"source": file} if page is None else {"source": file, "page": page}
+        for chunk in text_splitter.split_text(text): yield chunk, dict(metadata)
+
+def load_chunks(file):
+    """Parses and splits one file in the bulk-ingest process pool; a failure is re-raised in the parent."""
+    try: return file, list(iter_chunks(file))
+    except Exception as e: return file, FailedChunks(e)
+
+class FailedChunks:
+    def __init__(self, error): self.error = error
+    def __iter__(self): raise self.error
+
+# ------------------ File Index ------------------
+# files.json maps each ingested path to its size, mtime, content hash and chunk hashes. Chunks are stored
+# once under their content hash, so a chunk shared by several files is embedded and indexed once.
+def load_file_index():
+    global file_index
+    if os.path.exists(FILE_INDEX_PATH):
+        with open(FILE_INDEX_PATH, encoding="utf-8") as f: file_index = json.load(f)
+    else:
+        file_index = {}
+
+def chunk_hash(text): return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def file_hash(file):
+    digest = hashlib.sha256()
+    with open(file, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""): digest.update(block)
+    return digest.hexdigest()
+
+def file_state(file):
+    """Returns the new index entry for a file that needs (re)ingesting, or None if it is unchanged."""
+    st = os.stat(file)
+    entry = file_index.get(file)
+    if entry and entry["size"] == st.st_size and entry["mtime"] == st.st_mtime: return None
+    digest = file_hash(file)
+    if entry and entry["sha256"] == digest:
+        entry["mtime"] = st.st_mtime
+        return None
+    return {"size": st.st_size, "mtime": st.st_mtime, "sha256": digest, "chunks": []}
+
+# ------------------ Embedding ------------------
+def embedding_key(text):
+    normalized = " ".join(text.split())
+    return hashlib.sha256(f"{models.EMBEDDING_MODEL_NAME}\0{normalized}".encode("utf-8")).digest()
+
+def embed_texts(texts):
+    """Embeds chunk texts, reading vectors for previously seen (model, normalized text) pairs from the disk cache."""
+    global embedding_cache
+    if embedding_cache is None: embedding_cache = EmbeddingCache(EMBEDDING_CACHE_DIR, models.EMBEDDING_DIMENSION)
+    keys = [embedding_key(t) for t in texts]
+    found = embedding_cache.get_many(keys)
+    missing = list({key: i for i, key in enumerate(keys) if key not in found}.items())
+    if missing:
+        computed = models.get("embeddings").embed_documents([texts[i] for _, i in missing])
+        fresh = [key for key, _ in missing]
+        computed = np.asarray(computed, dtype=np.float32)
+        embedding_cache.put_many(fresh, computed)
+        found.update(zip(fresh, computed))
+    return [found[key] for key in keys]
+
+# ------------------ Ingestion ------------------
+def ingest_document(file):
+    if not os.path.exists(file): return "File not found."
+    if os.path.isdir(file): return ingest_directory(file)
+    if not file.lower().endswith(SUPPORTED_EXTENSIONS): return "Unsupported file format."
+    learned, unchanged, errors = ingest_files([file])
+    if errors: return errors[0]
+    if unchanged: return f"I already know {os.path.basename(file)}."
+    return f"📘 Learned from {os.path.basename(file)}."
+
+def ingest_directory(path, workers=None, batch_size=EMBED_BATCH_SIZE, progress=None):
+    files = sorted(os.path.join(root, name) for root, _, names in os.walk(path)
+                   for name in names if name.lower().endswith(SUPPORTED_EXTENSIONS))
+    if not files: return "No supported documents found."
+    learned, unchanged, errors = ingest_files(files, workers, batch_size, progress or print_progress)
+    return f"📘 Learned from {learned} files in {path} ({unchanged} unchanged, {len(errors)} skipped)."
+
+def ingest_files(files, workers=None, batch_size=EMBED_BATCH_SIZE, progress=None):
+    """Parses changed files (in a process pool when there are several), embeds only unseen chunks and appends
+    each batch to the run's delta segment as soon as it is embedded, so pending chunks never exceed one batch.
+    Finally drops chunks no file references any more. Returns (learned, unchanged, errors)."""
+    store_loaded.wait()
+    progress = progress or (lambda stage, done, total: None)
+    changed = {}
+    for file in map(os.path.abspath, files):
+        entry = file_state(file)
+        if entry: changed[file] = entry
+    unchanged = len(files) - len(changed)
+    if not changed:
+        save_file_index()
+        return 0, unchanged, []
+
+    stored = set(vector_store.index_to_docstore_id.values()) - tombstones if vector_store else set()
+    added, pending, errors = set(), {}, []
+
+    def commit_pending():
+        ids = list(pending)
+        texts = [pending[h][0] for h in ids]
+        commit_chunks([], ids, texts, [pending[h][1] for h in ids], embed_texts(texts))
+        added.update(ids)
+        pending.clear()
+        progress("Embedded", len(added), None)
+
+    with segment_run():
+        for done, (file, chunks) in enumerate(parse_files(list(changed), workers), 1):
+            hashes = []
+            try:
+                for text, metadata in chunks:
+                    h = chunk_hash(text)
+                    hashes.append(h)
+                    if h in stored or h in added or h in pending: continue
+                    pending[h] = (text, metadata)
+                    if len(pending) >= batch_size: commit_pending()
+            except Exception as e:
+                errors.append(f"{os.path.basename(file)}: {e}")
+                del changed[file]
+                continue
+            changed[file]["chunks"] = list(dict.fromkeys(hashes))
+            progress("Parsed", done, len(files) - unchanged)
+        if pending: commit_pending()
+        progress("Embedded", len(added), len(added))
+
+        # Chunks of replaced file versions, and chunks committed for a file that then failed to parse.
+        candidates = {h for file in changed for h in file_index.get(file, {}).get("chunks", [])} | added
+        file_index.update(changed)
+        referenced = {h for entry in file_index.values() for h in entry["chunks"]}
+        deleted = [h for h in candidates if h not in referenced and (h in stored or h in added)]
+        if deleted: commit_chunks(deleted, [], [], [], [])
+    save_file_index()
+    return len(changed), unchanged, errors
+
+def parse_files(files, workers=None):
+    """Yields (file, chunks); in-process the chunks are a lazy page-by-page generator. The pool keeps at most
+    PARSE_WINDOW files per worker submitted, so parsed documents cannot pile up while embedding lags behind."""
+    if len(files) == 1 or workers == 1:
+        for file in files: yield file, iter_chunks(file)
+        return
+    context = multiprocessing.get_context("spawn")
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        window = deque()
+        for file in files:
+            window.append(pool.submit(load_chunks, file))
+            if len(window) >= PARSE_WINDOW * workers: yield window.popleft().result()
+        while window: yield window.popleft().result()
+
+def print_progress(stage, done, total):
+    """total is None while it is not known yet."""
+    count = f"{done}" if total is None else f"{done}/{total}"
+    print(f"\r📚 {stage} {count}", end="\n" if done == total else "", flush=True)
+
+def commit_chunks(deleted, ids, texts, metadatas, vectors):
+    global vector_store
+    if vector_store is None:
+        if not ids: return
+        vector_store = FAISS.from_embeddings(list(zip(texts, vectors)), models.get("embeddings"), metadatas=metadatas, ids=ids)
+        for doc_id, text in zip(ids, texts): keyword_index.add(doc_id, text)
+        save_vector_store()
+        invalidate_retrieval_cache()
+        return
+    apply_changes(deleted, ids, texts, metadatas, vectors)
+    if deleted or ids: append_segment(deleted, ids, texts, metadatas, vectors)
+    elif open_segment is None: compact_if_due()
+    invalidate_retrieval_cache()
+
+def apply_changes(deleted, ids, texts, metadatas, vectors):
+    """Flat indexes drop deleted vectors in place; ANN indexes cannot renumber, so their deletions are
+    tombstoned and filtered at query time until the next rebuild. Re-added tombstoned chunks are revived."""
+    if deleted or ids: load_into_memory()
+    for doc_id in deleted:
+        doc = vector_store.docstore.search(doc_id)
+        if isinstance(doc, Chunk): keyword_index.remove(doc_id, doc.page_content)
+    for doc_id, text in zip(ids, texts): keyword_index.add(doc_id, text)
+    if deleted:
+        if index_kind(vector_store.index) == "flat": vector_store.delete(deleted)
+        else: tombstones.update(deleted)
+    revived = {i for i in ids if i in tombstones}
+    tombstones.difference_update(revived)
+    fresh = [n for n, i in enumerate(ids) if i not in revived]
+    if fresh:
+        vector_store.add_embeddings([(texts[n], vectors[n]) for n in fresh], metadatas=[metadatas[n] for n in fresh],
+                                    ids=[ids[n] for n in fresh])
+
+def load_into_memory():
+    """A memory-mapped index is read-only, so it is re-read into RAM before its first mutation."""
+    global mapped_index_path
+    if mapped_index_path:
+        vector_store.index = configure(faiss.read_index(mapped_index_path))
+        mapped_index_path = None
+
+def live_count(): return vector_store.index.ntotal - len(tombstones)
+
+def requested_index_type():
+    return INDEX_TYPE if INDEX_TYPE != "auto" else (manifest or {}).get("index_type", "auto")
+
+def rebuild_index(kind=None):
+    store_loaded.wait()
+    return reindex(kind)
+
+def reindex(kind=None):
+    """Rebuilds the index from cached chunk embeddings (no model inference for known chunks) and compacts."""
+    global vector_store, mapped_index_path
+    if vector_store is None: return "Knowledge base is empty."
+    ids = [vector_store.index_to_docstore_id[i] for i in range(vector_store.index.ntotal)]
+    ids = [i for i in ids if i not in tombstones]
+    docs = {i: vector_store.docstore.search(i) for i in ids}
+    built = kind or desired_kind(len(ids), requested_index_type())
+    if ids: index = build_index(np.asarray(embed_texts([docs[i].page_content for i in ids]), dtype=np.float32), built)
+    else: index = faiss.IndexFlatL2(models.EMBEDDING_DIMENSION)
+    vector_store = FAISS(models.get("embeddings"), index, InMemoryDocstore(docs), dict(enumerate(ids)))
+    mapped_index_path = None
+    tombstones.clear()
+    write_base(index_type=kind)
+    invalidate_retrieval_cache()
+    return f"Rebuilt a {index_kind(index)} index over {len(ids)} chunks."
+
+def benchmark_index(queries=200, k=10):
+    """Recall and latency of the live index against exact search over the same chunk embeddings."""
+    if vector_store is None: return None
+    texts = [vector_store.docstore.search(vector_store.index_to_docstore_id[i]).page_content
+             for i in range(vector_store.index.ntotal)]
+    return benchmark(vector_store.index, np.asarray(embed_texts(texts), dtype=np.float32), queries, k)
+
+def save_file_index():
+    if not file_index: return
+    os.makedirs(VECTOR_STORE_DIR, exist_ok=True)
+    write_json(FILE_INDEX_PATH, file_index)
+
+# ------------------ Retrieval ------------------
+def normalize_query(query): return " ".join(query.lower().split())
+
+def embed_query(query):
+    key = normalize_query(query)
+    vector = query_embeddings.get(key)
+    if vector is None:
+        vector = models.get("embeddings").embed_query(query)
+        query_embeddings.put(key, vector)
+    return vector
+
+def retrieve_with_scores(query, k=RETRIEVE_K, min_similarity=MIN_SIMILARITY):
+    """Returns up to k (chunk, cosine similarity) pairs in fused rank order. Strong keyword hits (top
+    KEYWORD_PASS_RANK BM25 results scoring at least KEYWORD_PASS_RATIO of the best) always pass, since exact-term
+    matches such as part numbers can score low on dense similarity; other chunks need min_similarity."""
+    if not vector_store or not vector_store.index.ntotal: return []
+    key = (store_generation, normalize_query(query), k, min_similarity)
+    hits = retrieval_results.get(key)
+    if hits is None:
+        query_vector = np.asarray(embed_query(query), dtype=np.float32)
+        candidates = max(k, FUSION_CANDIDATES)
+        fetch = min(candidates + len(tombstones), vector_store.index.ntotal)
+        _, labels = vector_store.index.search(query_vector[None, :], fetch)
+        dense = [vector_store.index_to_docstore_id[i] for i in labels[0] if i != -1]
+        dense = [i for i in dense if i not in tombstones][:candidates]
+        keyword_hits = keyword_index.search(query, candidates)
+        lexical = [doc_id for doc_id, _ in keyword_hits]
+        strong = {doc_id for doc_id, score in keyword_hits[:KEYWORD_PASS_RANK]
+                  if score >= KEYWORD_PASS_RATIO * keyword_hits[0][1]}
+        ids = fuse_rankings([dense, lexical])[:k]
+        chunks = [vector_store.docstore.search(i) for i in ids]
+        scores = similarities(query_vector, [chunk.page_content for chunk in chunks])
+        hits = [(chunk, score) for i, chunk, score in zip(ids, chunks, scores) if i in strong or score >= min_similarity]
+        retrieval_results.put(key, hits)
+    return hits
+
+def retrieve_context(query, k=RETRIEVE_K, budget=CONTEXT_TOKENS):
+    """Relevant chunks packed best-first into about budget tokens; "" when nothing clears the similarity cutoff."""
+    return pack_context([chunk.page_content for chunk, _ in retrieve_with_scores(query, k)], budget)
+
+def similarities(query_vector, texts):
+    """Cosine similarity against the cached chunk embeddings, so BM25-only hits get a comparable score too."""
+    if not texts: return []
+    vectors = np.asarray(embed_texts(texts), dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1) * np.linalg.norm(query_vector)
+    return (vectors @ query_vector / np.maximum(norms, 1e-12)).tolist()
+
+def estimate_tokens(text): return len(text) // 4 + 1
+
+def overlap(a, b):
+    """Length of the longest suffix of a that is a prefix of b, as left by the splitter's chunk overlap."""
+    for n in range(min(len(a), len(b), CHUNK_OVERLAP), MIN_OVERLAP - 1, -1):
+        if a.endswith(b[:n]): return n
+    return 0
+
+def pack_context(texts, budget=CONTEXT_TOKENS):
+    """Packs texts best-first until the token budget is spent. Chunks already contained in a passage are
+    dropped and overlapping chunks are stitched together, so text shared by neighbours is sent once."""
+    passages = []
+    for text in texts:
+        if any(text in passage for passage in passages): continue
+        packed = stitch(passages, text)
+        if sum(map(estimate_tokens, packed)) <= budget: passages = packed
+    return "\n\n".join(passages)
+
+def stitch(passages, text):
+    """Returns passages plus text, joined with every passage it overlaps and placed where the first of those was."""
+    rest, slot = [], None
+    for passage in passages:
+        cut = overlap(passage, text)
+        if cut: text = passage + text[cut:]
+        else:
+            cut = overlap(text, passage)
+            if cut: text = text + passage[cut:]
+        if not cut:
+            rest.append(passage)
+        elif slot is None:
+            slot = len(rest)
+    if slot is None: slot = len(rest)
+    return rest[:slot] + [text] + rest[slot:]
+
+def fuse_rankings(rankings, k=RRF_K):
+    """Reciprocal rank fusion: each ranking adds 1 / (k + rank) per id, so exact-term BM25 hits and
+    dense neighbours both surface without calibrating their scores against each other."""
+    scores = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, 1): scores[doc_id] = scores.get(doc_id, 0.0) + 1 / (k + rank)
+    return sorted(scores, key=scores.get, reverse=True)
+
+def invalidate_retrieval_cache():
+    global store_generation
+    store_generation += 1
+    retrieval_results.clear()
+
+def cache_stats():
+    return {"query_embeddings": query_embeddings.stats(), "retrieval": retrieval_results.stats()}
+
+def clear_knowledge():
+    global vector_store, manifest, mapped_index_path, keyword_index
+    store_loaded.wait()
+    vector_store = None
+    manifest = None
+    mapped_index_path = None
+    if os.path.exists(VECTOR_STORE_DIR): shutil.rmtree(VECTOR_STORE_DIR)
+    file_index.clear()
+    tombstones.clear()
+    keyword_index = BM25Index()
+    invalidate_retrieval_cache()
+    return "Knowledge base cleared."
+
+# ------------------ CLI ------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Friday knowledge base tools")
+    commands = parser.add_subparsers(dest="command", required=True)
+    ingest = commands.add_parser("ingest", help="bulk-ingest every .txt/.pdf/.docx under a directory")
+    ingest.add_argument("path")
+    ingest.add_argument("--workers", type=int, default=None)
+    ingest.add_argument("--batch-size", type=int, default=EMBED_BATCH_SIZE)
+    rebuild = commands.add_parser("rebuild", help="rebuild the vector index, optionally switching its type")
+    rebuild.add_argument("--index", choices=["flat", "ivf", "ivfpq", "hnsw"], default=None)
+    bench = commands.add_parser("bench", help="report recall and latency of the index against exact search")
+    bench.add_argument("--queries", type=int, default=200)
+    bench.add_argument("-k", type=int, default=10)
+    args = parser.parse_args()
+
+    load_vector_store()
+    if args.command == "ingest":
+        print(ingest_directory(args.path, workers=args.workers, batch_size=args.batch_size))
+    elif args.command == "rebuild":
+        print(rebuild_index(args.index))
+    elif args.command == "bench":
+        print(json.dumps(benchmark_index(args.queries, args.k), indent=2))
@@ -0,0 +1,73 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# ------------------ Model Registry ------------------
+class ModelRegistry:
+    """Loads models on first use; warm() starts several loads in parallel in the background."""
+
+    def __init__(self, max_workers=4):
+        self.loaders = {}
+        self.futures = {}
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="model-loader")
+
+    def register(self, name, loader):
+        self.loaders[name] = loader
+
+    def _submit(self, name):
+        with self.lock:
+            if name not in self.futures:
+                self.futures[name] = self.executor.submit(self.loaders[name])
+            return self.futures[name]
+
+    def warm(self, *names):
+        for name in names: self._submit(name)
+
+    def get(self, name):
+        return self._submit(name).result()
+
+    def is_loaded(self, name):
+        future = self.futures.get(name)
+        return future is not None and future.done() and future.exception() is None
+
+registry = ModelRegistry()
+
+def get(name): return registry.get(name)
+def warm(*names): registry.warm(*names)
+
+# ------------------ Loaders ------------------
+TTS_MODEL_NAME = "tts_models/en/ljspeech/tacotron2-DDC"
+EMBEDDING_MODEL_NAME = "all-MiniLM-L6-v2"
+EMBEDDING_DIMENSION = 384
+VOSK_MODEL_PATH = os.environ.get("VOSK_MODEL", "vosk-model-small-en-us-0.15")
+
+def load_nlp():
+    import spacy
+    return spacy.load("en_core_web_sm")
+
+def load_pyttsx3():
+    import pyttsx3
+    engine = pyttsx3.init()
+    engine.setProperty('rate', 165)
+    engine.setProperty('volume', 1.0)
+    return engine
+
+def load_tts():
+    from TTS.api import TTS
+    return TTS(model_name=TTS_MODEL_NAME, progress_bar=False, gpu=False)
+
+def load_embeddings():
+    from langchain.embeddings import SentenceTransformerEmbeddings
+    return SentenceTransformerEmbeddings(model_name=EMBEDDING_MODEL_NAME)
+
+def load_vosk():
+    import vosk
+    vosk.SetLogLevel(-1)
+    return vosk.Model(VOSK_MODEL_PATH)
+
+registry.register("nlp", load_nlp)
+registry.register("pyttsx3", load_pyttsx3)
+registry.register("tts", load_tts)
+registry.register("embeddings", load_embeddings)
+registry.register("vosk", load_vosk)
@@ -0,0 +1,214 @@
+import os
+import re
+import queue
+import hashlib
+import threading
+import contextlib
+import numpy as np
+import simpleaudio as sa
+from caches import LRUCache
+
+# ------------------ Sentence Splitting ------------------
+SENTENCE_END = re.compile(r'(?<=[.!?])\s+|\n+')
+
+def split_sentences(text):
+    return [s.strip() for s in SENTENCE_END.split(text) if s and s.strip()]
+
+def stream_sentences(tokens):
+    buffer = ""
+    for token in tokens:
+        buffer += token
+        *complete, buffer = SENTENCE_END.split(buffer)
+        for sentence in complete:
+            if sentence and sentence.strip(): yield sentence.strip()
+    if buffer.strip(): yield buffer.strip()
+
+# ------------------ Streaming Pipeline ------------------
+class SpeechPipeline:
+    """Synthesizes sentences on one worker while another plays the previous ones."""
+
+    def __init__(self, synthesize, max_ahead=2):
+        self.synthesize = synthesize
+        self.sentences = queue.Queue()
+        self.clips = queue.Queue(maxsize=max_ahead)
+        self.generation = 0
+        self.current = None
+        self.playing = threading.Event()
+        self.lock = threading.Lock()
+        threading.Thread(target=self._synth_worker, daemon=True).start()
+        threading.Thread(target=self._play_worker, daemon=True).start()
+
+    def feed(self, sentence):
+        self.sentences.put((self.generation, sentence))
+
+    def end(self):
+        done = threading.Event()
+        self.sentences.put((self.generation, done))
+        return done
+
+    def say(self, text):
+        for sentence in split_sentences(text): self.feed(sentence)
+        return self.end()
+
+    def cancel(self):
+        """Stops the clip that is playing and drops everything queued; pending end() events still fire."""
+        with self.lock:
+            self.generation += 1
+            for q in (self.sentences, self.clips):
+                while True:
+                    try: _, item = q.get_nowait()
+                    except queue.Empty: break
+                    if isinstance(item, threading.Event): item.set()
+            if self.current: self.current.stop()
+
+    def _synth_worker(self):
+        while True:
+            generation, item = self.sentences.get()
+            if not isinstance(item, threading.Event):
+                if generation != self.generation: continue
+                try: item = self.synthesize(item)
+                except Exception as e:
+                    print(f"\n⚠️ Speech synthesis failed: {e}")
+                    continue
+            self.clips.put((generation, item))
+
+    def _play_worker(self):
+        while True:
+            generation, item = self.clips.get()
+            if isinstance(item, threading.Event):
+                item.set()
+                continue
+            with self.lock:
+                if generation != self.generation: continue
+                self.current = item.play()
+                self.playing.set()
+            self.current.wait_done()
+            self.playing.clear()
+
+# ------------------ Synthesis ------------------
+class PCMConverter:
+    """Converts float waveforms to int16 PCM through a scratch buffer that is reused between calls."""
+
+    def __init__(self):
+        self.scratch = np.empty(0, dtype=np.float32)
+
+    def convert(self, wav):
+        wav = np.asarray(wav, dtype=np.float32)
+        if self.scratch.size < wav.size:
+            self.scratch = np.empty(max(wav.size, 2 * self.scratch.size), dtype=np.float32)
+        buf = self.scratch[:wav.size]
+        np.multiply(wav, 32767, out=buf)
+        np.clip(buf, -32768, 32767, out=buf)
+        pcm = np.empty(wav.size, dtype=np.int16)
+        np.copyto(pcm, buf, casting="unsafe")
+        return pcm
+
+def synthesize_pcm(tts_model, text, converter):
+    return converter.convert(tts_model.tts(text=text))
+
+def play_waveform(wav, sample_rate, converter=None):
+    pcm = (converter or PCMConverter()).convert(wav)
+    return sa.play_buffer(pcm, 1, 2, sample_rate)
+
+# ------------------ Phrase Cache ------------------
+class PhraseCache:
+    """Synthesized (PCM, sample rate) keyed by (text, voice model): an in-memory LRU backed by a size-capped
+    directory of .pcm files. Disk writes run on a background thread and only for phrases that are pre-warmed
+    or heard a second time, so one-off LLM sentences never wait on the disk."""
+
+    HEADER = np.dtype(np.uint32).itemsize // np.dtype(np.int16).itemsize
+
+    def __init__(self, directory="cache/tts", max_entries=256, max_disk_chars=120, max_disk_bytes=64 << 20):
+        self.directory = directory
+        self.max_disk_chars = max_disk_chars
+        self.max_disk_bytes = max_disk_bytes
+        self.memory = LRUCache(max_entries)
+        self.persisted = set()
+        self.writes = queue.Queue()
+        self.writer = None
+
+    @staticmethod
+    def key(text, model_name):
+        return hashlib.sha256(f"{model_name}\0{text}".encode("utf-8")).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, key + ".pcm")
+
+    def get(self, key):
+        """Returns (pcm, rate) or None; the rate is stored in the file, so a hit never needs the model."""
+        entry = self.memory.get(key)
+        if entry is None and os.path.exists(self.path(key)):
+            data = np.fromfile(self.path(key), dtype=np.int16)
+            entry = data[self.HEADER:], int(data[:self.HEADER].view(np.uint32)[0])
+            self.memory.put(key, entry)
+            self.persisted.add(key)
+        return entry
+
+    def put(self, key, pcm, rate):
+        self.memory.put(key, (pcm, rate))
+
+    def persist(self, key, text, pcm, rate):
+        """Queues a background write; long sentences and phrases already on disk are skipped."""
+        if key in self.persisted or len(text) > self.max_disk_chars: return
+        self.persisted.add(key)
+        if self.writer is None:
+            self.writer = threading.Thread(target=self._write_loop, daemon=True)
+            self.writer.start()
+        self.writes.put((key, pcm, rate))
+
+    def _write_loop(self):
+        while True:
+            key, pcm, rate = self.writes.get()
+            os.makedirs(self.directory, exist_ok=True)
+            tmp = self.path(key) + ".tmp"
+            with open(tmp, "wb") as f:
+                f.write(np.array([rate], dtype=np.uint32).tobytes())
+                f.write(pcm.tobytes())
+            os.replace(tmp, self.path(key))
+            self.evict()
+
+    def evict(self):
+        """Removes the least recently written files once the directory exceeds max_disk_bytes."""
+        files = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".pcm"): continue
+            st = os.stat(os.path.join(self.directory, name))
+            files.append((st.st_mtime, st.st_size, name))
+        total = sum(size for _, size, _ in files)
+        for _, size, name in sorted(files):
+            if total <= self.max_disk_bytes: break
+            os.remove(os.path.join(self.directory, name))
+            self.persisted.discard(name[:-len(".pcm")])
+            total -= size
+
+class CachedSynthesizer:
+    """Pipeline synthesize callable that serves repeated sentences from a PhraseCache."""
+
+    def __init__(self, load_model, model_name, cache=None, quiet=contextlib.nullcontext):
+        self.load_model = load_model
+        self.model_name = model_name
+        self.cache = cache or PhraseCache()
+        self.quiet = quiet
+        self.converter = PCMConverter()
+        self.lock = threading.Lock()
+
+    def pcm(self, text, persist=False):
+        """Returns (pcm, rate). The model is only loaded on a miss; warmed and repeated phrases go to disk."""
+        key = self.cache.key(text, self.model_name)
+        entry = self.cache.get(key)
+        if entry is None:
+            tts_model = self.load_model()
+            with self.lock, self.quiet(): pcm = synthesize_pcm(tts_model, text, self.converter)
+            entry = pcm, tts_model.synthesizer.output_sample_rate
+            self.cache.put(key, *entry)
+            if not persist: return entry
+        self.cache.persist(key, text, *entry)
+        return entry
+
+    def __call__(self, text):
+        pcm, rate = self.pcm(text)
+        return sa.WaveObject(pcm, 1, 2, rate)
+
+    def warm(self, phrases):
+        for phrase in phrases:
+            for sentence in split_sentences(phrase): self.pcm(sentence, persist=True)
@@ -0,0 +1,93 @@
+import os
+import math
+import time
+import faiss
+import numpy as np
+
+# ------------------ Index Types ------------------
+INDEX_KINDS = ("flat", "ivf", "ivfpq", "hnsw")
+INDEX_TYPE = os.environ.get("FRIDAY_INDEX", "auto")
+ANN_THRESHOLD = int(os.environ.get("FRIDAY_ANN_THRESHOLD", 200_000))
+MIN_TRAIN_POINTS = 10_000
+IVF_NPROBE = 16
+PQ_SUBQUANTIZERS = 48
+HNSW_M = 32
+HNSW_EF_SEARCH = 64
+MMAP_INDEX = os.environ.get("FRIDAY_MMAP_INDEX", "0") == "1"
+MMAP_FLAGS = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP) | faiss.IO_FLAG_READ_ONLY
+
+def index_kind(index):
+    if isinstance(index, faiss.IndexHNSW): return "hnsw"
+    if isinstance(index, faiss.IndexIVFPQ): return "ivfpq"
+    if isinstance(index, faiss.IndexIVF): return "ivf"
+    return "flat"
+
+def desired_kind(count, requested="auto"):
+    """Exact search until ANN_THRESHOLD chunks under "auto"; IVF variants need enough points to train."""
+    kind = ("ivf" if count >= ANN_THRESHOLD else "flat") if requested == "auto" else requested
+    if kind in ("ivf", "ivfpq") and count < MIN_TRAIN_POINTS: return "flat"
+    return kind
+
+def configure(index):
+    """Search-time parameters are not serialized by faiss, so they are reapplied after every build or load."""
+    kind = index_kind(index)
+    if kind in ("ivf", "ivfpq"): faiss.extract_index_ivf(index).nprobe = IVF_NPROBE
+    elif kind == "hnsw": index.hnsw.efSearch = HNSW_EF_SEARCH
+    return index
+
+def read_index(path, mmap=False):
+    """Returns (index, mapped). A mapped index shares the OS page cache with other processes but is read-only;
+    faiss builds or index files that cannot be mapped are read into RAM instead."""
+    if mmap:
+        try: return configure(faiss.read_index(path, MMAP_FLAGS)), True
+        except RuntimeError: pass
+    return configure(faiss.read_index(path)), False
+
+def build_index(vectors, kind):
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    n, d = vectors.shape
+    if kind == "flat":
+        index = faiss.IndexFlatL2(d)
+    elif kind == "hnsw":
+        index = faiss.IndexHNSWFlat(d, HNSW_M)
+    elif kind in ("ivf", "ivfpq"):
+        nlist = max(1, min(int(4 * math.sqrt(n)), n // 39))
+        quantizer = faiss.IndexFlatL2(d)
+        if kind == "ivf": index = faiss.IndexIVFFlat(quantizer, d, nlist)
+        else: index = faiss.IndexIVFPQ(quantizer, d, nlist, PQ_SUBQUANTIZERS, 8)
+        sample = vectors[np.random.default_rng(0).choice(n, min(n, 256 * nlist), replace=False)]
+        index.train(sample)
+    else:
+        raise ValueError(f"Unknown index type '{kind}', expected one of {INDEX_KINDS}")
+    index.add(vectors)
+    return configure(index)
+
+# ------------------ Benchmark ------------------
+def benchmark(index, vectors, queries=200, k=10):
+    """Recall@k and per-query latency of index against an exact flat index over the same vectors."""
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    exact = faiss.IndexFlatL2(vectors.shape[1])
+    exact.add(vectors)
+    sample = vectors[np.random.default_rng(1).choice(len(vectors), min(len(vectors), queries), replace=False)]
+
+    def run(idx):
+        labels, timings = [], []
+        for query in sample:
+            start = time.perf_counter()
+            _, found = idx.search(query[None, :], k)
+            timings.append((time.perf_counter() - start) * 1000)
+            labels.append(set(found[0]) - {-1})
+        return labels, timings
+
+    truth, flat_ms = run(exact)
+    approx, index_ms = run(index)
+    recall = sum(len(t & a) / max(len(t), 1) for t, a in zip(truth, approx)) / len(sample)
+    return {
+        "kind": index_kind(index),
+        "count": len(vectors),
+        f"recall@{k}": round(recall, 4),
+        "flat_ms": round(float(np.mean(flat_ms)), 3),
+        "flat_p95_ms": round(float(np.percentile(flat_ms, 95)), 3),
+        "index_ms": round(float(np.mean(index_ms)), 3),
+        "index_p95_ms": round(float(np.percentile(index_ms, 95)), 3),
+    }
@@ -8,9 +8,11 @@ for i, voice in enumerate(voices):
 
 
 from TTS.api import TTS
+from speech import play_waveform
 
 # Load a pretrained female English voice
 tts = TTS(model_name="tts_models/en/ljspeech/tacotron2-DDC", progress_bar=False, gpu=False)
 
-# Generate audio to a file
-tts.tts_to_file(text="Hello Sai, I am Friday with a natural female voice.", file_path="output.wav")
+# Generate audio and play it straight from memory
+wav = tts.tts(text="Hello Sai, I am Friday with a natural female voice.")
+play_waveform(wav, tts.synthesizer.output_sample_rate).wait_done()
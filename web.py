@@ -0,0 +1,185 @@
+import os
+import codecs
+import atexit
+import asyncio
+import threading
+from html.parser import HTMLParser
+from urllib.parse import parse_qs, urlparse
+import aiohttp
+from bs4 import BeautifulSoup
+from caches import TTLCache
+from keyword_index import BM25Index
+
+# ------------------ Settings ------------------
+SEARCH_URL = os.environ.get("FRIDAY_SEARCH_URL", "https://html.duckduckgo.com/html/")
+REQUEST_TIMEOUT = 5
+PER_HOST_LIMIT = 4
+QUERY_TTL = 15 * 60
+PAGE_TTL = 60 * 60
+FETCH_RESULTS = 3
+PAGE_PARAGRAPHS = 12
+MIN_PARAGRAPH_CHARS = 40
+READ_CHUNK = 16 * 1024
+USER_AGENT = "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Safari/537.36"
+
+# ------------------ Client ------------------
+class WebClient:
+    """Search and page fetches on one background event loop sharing a pooled aiohttp session.
+    Results are kept in TTL caches, and concurrent requests for the same key share a single fetch."""
+
+    def __init__(self, search_url=SEARCH_URL, timeout=REQUEST_TIMEOUT, per_host=PER_HOST_LIMIT,
+                 query_ttl=QUERY_TTL, page_ttl=PAGE_TTL):
+        self.search_url = search_url
+        self.timeout = timeout
+        self.per_host = per_host
+        self.results = TTLCache(256, query_ttl)
+        self.pages = TTLCache(128, page_ttl)
+        self.inflight = {}
+        self.loop = None
+        self.session = None
+        self.lock = threading.Lock()
+
+    def run(self, coro):
+        """Runs a coroutine on the client's loop from any thread and waits for its result."""
+        with self.lock:
+            if self.loop is None:
+                self.loop = asyncio.new_event_loop()
+                threading.Thread(target=self.loop.run_forever, daemon=True).start()
+                atexit.register(self.close)
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    def close(self):
+        if self.loop and self.session: asyncio.run_coroutine_threadsafe(self.session.close(), self.loop).result(1)
+        self.session = None
+
+    async def get_session(self):
+        if self.session is None:
+            self.session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit_per_host=self.per_host, ttl_dns_cache=300),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                headers={"User-Agent": USER_AGENT})
+        return self.session
+
+    async def cached(self, cache, key, fetch):
+        value = cache.get(key)
+        if value is not None: return value
+        task = self.inflight.get(key)
+        if task is None:
+            task = self.inflight[key] = asyncio.ensure_future(fetch())
+            task.add_done_callback(lambda _: self.inflight.pop(key, None))
+        value = await asyncio.shield(task)
+        # DuckDuckGo answers rate-limited requests with an HTTP 202 page that has no results; never cache those.
+        if value: cache.put(key, value)
+        return value
+
+    async def search(self, query, max_results=3):
+        """Returns up to max_results {"title", "href", "body"} dicts from the DuckDuckGo HTML endpoint."""
+        async def fetch():
+            session = await self.get_session()
+            async with session.post(self.search_url, data={"q": query}) as response:
+                response.raise_for_status()
+                html = await response.text()
+            return await asyncio.get_running_loop().run_in_executor(None, parse_results, html)
+        results = await self.cached(self.results, ("search", query), fetch)
+        return results[:max_results]
+
+    async def fetch_paragraphs(self, url, max_paragraphs=PAGE_PARAGRAPHS):
+        """Streams a page through ParagraphParser and stops downloading once max_paragraphs are collected."""
+        async def fetch():
+            session = await self.get_session()
+            parser = ParagraphParser(max_paragraphs)
+            async with session.get(url) as response:
+                response.raise_for_status()
+                if "html" not in response.content_type: return []
+                decoder = incremental_decoder(response.charset)
+                async for block in response.content.iter_chunked(READ_CHUNK):
+                    parser.feed(decoder.decode(block))
+                    if parser.done: break
+            parser.close()
+            return parser.paragraphs[:max_paragraphs]
+        return await self.cached(self.pages, ("page", url, max_paragraphs), fetch)
+
+    async def fetch_text(self, url, max_paragraphs=3):
+        """Returns the text of the first paragraphs of a page."""
+        return " ".join(await self.fetch_paragraphs(url, max_paragraphs))
+
+    async def best_passages(self, query, urls, top=3):
+        """Fetches the pages concurrently and returns the paragraphs across them that best match the query.
+        Pages that fail to load are skipped."""
+        pages = await asyncio.gather(*(self.fetch_paragraphs(url) for url in urls), return_exceptions=True)
+        return rank_passages(query, [p for page in pages if isinstance(page, list) for p in page], top)
+
+# ------------------ Parsing ------------------
+def parse_results(html):
+    results = []
+    for result in BeautifulSoup(html, "html.parser").select("div.result"):
+        link = result.select_one("a.result__a")
+        if link is None or not link.get("href"): continue
+        snippet = result.select_one(".result__snippet")
+        results.append({"title": link.get_text(" ", strip=True), "href": unwrap_redirect(link["href"]),
+                        "body": snippet.get_text(" ", strip=True) if snippet else ""})
+    return results
+
+def unwrap_redirect(href):
+    """DuckDuckGo wraps result links as //duckduckgo.com/l/?uddg=<target>."""
+    target = parse_qs(urlparse(href).query).get("uddg")
+    return target[0] if target else href
+
+class ParagraphParser(HTMLParser):
+    """Incremental <p> text extractor that ignores page chrome such as navigation, scripts and footers."""
+
+    SKIP = {"script", "style", "noscript", "nav", "header", "footer", "aside", "form", "template"}
+
+    def __init__(self, max_paragraphs=PAGE_PARAGRAPHS, min_chars=MIN_PARAGRAPH_CHARS):
+        super().__init__(convert_charrefs=True)
+        self.max_paragraphs = max_paragraphs
+        self.min_chars = min_chars
+        self.paragraphs = []
+        self.current = None
+        self.skipping = 0
+
+    @property
+    def done(self):
+        return len(self.paragraphs) >= self.max_paragraphs
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIP: self.skipping += 1
+        elif tag == "p" and not self.skipping:
+            self.finish_paragraph()
+            self.current = []
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIP: self.skipping = max(0, self.skipping - 1)
+        elif tag == "p": self.finish_paragraph()
+
+    def handle_data(self, data):
+        if self.current is not None and not self.skipping: self.current.append(data)
+
+    def finish_paragraph(self):
+        if self.current is None: return
+        text = " ".join("".join(self.current).split())
+        self.current = None
+        if len(text) >= self.min_chars and not self.done: self.paragraphs.append(text)
+
+    def close(self):
+        super().close()
+        self.finish_paragraph()
+
+def incremental_decoder(charset):
+    try: return codecs.getincrementaldecoder(charset or "utf-8")(errors="ignore")
+    except LookupError: return codecs.getincrementaldecoder("utf-8")(errors="ignore")
+
+def rank_passages(query, passages, top=3):
+    """BM25 over the paragraphs themselves; falls back to page order when no query term matches."""
+    passages = list(dict.fromkeys(passages))
+    index = BM25Index()
+    for n, passage in enumerate(passages): index.add(n, passage)
+    ranked = [passages[n] for n, _ in index.search(query, top)]
+    return ranked or passages[:top]
+
+# ------------------ Module API ------------------
+client = WebClient()
+
+def search(query, max_results=3): return client.run(client.search(query, max_results))
+def fetch_text(url, max_paragraphs=3): return client.run(client.fetch_text(url, max_paragraphs))
+def best_passages(query, urls, top=3): return client.run(client.best_passages(query, urls, top))
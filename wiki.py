@@ -0,0 +1,157 @@
+import os
+import re
+import bz2
+import gzip
+import time
+import sqlite3
+import argparse
+import threading
+from concurrent import futures
+import xml.etree.ElementTree as ET
+import wikipedia
+from caches import TTLCache
+
+# ------------------ Settings ------------------
+CACHE_PATH = os.path.join("cache", "wikipedia.sqlite")
+DUMP_PATH = os.environ.get("FRIDAY_WIKI_DUMP", os.path.join("cache", "wikipedia_abstracts.sqlite"))
+OFFLINE = os.environ.get("FRIDAY_WIKI_OFFLINE", "0") == "1"
+SUMMARY_TTL = 7 * 24 * 3600
+NETWORK_TIMEOUT = float(os.environ.get("FRIDAY_WIKI_TIMEOUT", 3))
+NETWORK_WORKERS = 2
+IMPORT_BATCH = 5000
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+LEADING_WORDS = {"what", "who", "whom", "where", "when", "which", "is", "are", "was", "were", "does", "do", "did",
+                 "tell", "me", "about", "a", "an", "the", "of", "define", "meaning", "search", "look", "up"}
+MIN_PREFIX_CHARS = 3
+
+def normalize_title(title): return " ".join(title.lower().replace("_", " ").split())
+
+def topic(query):
+    """Strips question words and articles so "what is python?" looks up the title "python"."""
+    words = normalize_title(query.strip(" ?!.")).split()
+    while len(words) > 1 and words[0] in LEADING_WORDS: words.pop(0)
+    return " ".join(words)
+
+def first_sentences(text, sentences):
+    return " ".join(SENTENCE_END.split(text.strip())[:sentences])
+
+# ------------------ Provider ------------------
+class WikipediaProvider:
+    """Summary lookups answered from memory, then the on-disk TTL cache, then an imported abstracts dump,
+    and only then the Wikipedia API (never in offline mode). Returns "" when no page matches;
+    disambiguation and network errors are raised as wikipedia exceptions."""
+
+    def __init__(self, cache_path=CACHE_PATH, dump_path=DUMP_PATH, offline=OFFLINE, ttl=SUMMARY_TTL,
+                 timeout=NETWORK_TIMEOUT):
+        self.offline = offline
+        self.ttl = ttl
+        self.timeout = timeout
+        self.network = futures.ThreadPoolExecutor(NETWORK_WORKERS, thread_name_prefix="wikipedia")
+        self.slots = threading.BoundedSemaphore(NETWORK_WORKERS)
+        self.memory = TTLCache(512, ttl)
+        self.lock = threading.Lock()
+        os.makedirs(os.path.dirname(cache_path) or ".", exist_ok=True)
+        self.cache = sqlite3.connect(cache_path, check_same_thread=False)
+        self.cache.execute("CREATE TABLE IF NOT EXISTS summaries (key TEXT PRIMARY KEY, text TEXT, expires REAL)")
+        self.dump = sqlite3.connect(f"file:{dump_path}?mode=ro", uri=True, check_same_thread=False) \
+            if os.path.exists(dump_path) else None
+
+    def summary(self, query, sentences=2):
+        query = topic(query)
+        key = f"{sentences}\0{query}"
+        text = self.memory.get(key)
+        if text is not None: return text
+        with self.lock:
+            row = self.cache.execute("SELECT text FROM summaries WHERE key = ? AND expires > ?", (key, time.time())).fetchone()
+            if row is None and self.dump:
+                row = self.lookup_dump(query)
+                if row: row = (first_sentences(row[0], sentences),)
+        if row is None:
+            if self.offline: return ""
+            try: row = (self.fetch(query, sentences),)
+            except wikipedia.exceptions.PageError: return ""
+        self.remember(key, row[0])
+        return row[0]
+
+    def lookup_dump(self, title_key):
+        """Exact title first, then the first title starting with it (e.g. "python (programming language)"),
+        found by a range scan on the primary key. The dump has no redirects, so this stands in for them."""
+        row = self.dump.execute("SELECT abstract FROM abstracts WHERE title_key = ?", (title_key,)).fetchone()
+        if row or len(title_key) < MIN_PREFIX_CHARS: return row
+        return self.dump.execute("SELECT abstract FROM abstracts WHERE title_key > ? AND title_key < ? "
+                                 "ORDER BY title_key LIMIT 1", (title_key, title_key + "\uffff")).fetchone()
+
+    def fetch(self, query, sentences):
+        """The wikipedia library sets no request timeout, so calls run on a small pool of their own and are
+        abandoned after timeout seconds. While every slot is held by a stalled call, lookups fail fast."""
+        if not self.slots.acquire(blocking=False): raise wikipedia.exceptions.HTTPTimeoutError(query)
+        future = self.network.submit(wikipedia.summary, query, sentences=sentences)
+        future.add_done_callback(lambda _: self.slots.release())
+        try: return future.result(timeout=self.timeout)
+        except futures.TimeoutError: raise wikipedia.exceptions.HTTPTimeoutError(query) from None
+
+    def remember(self, key, text):
+        self.memory.put(key, text)
+        with self.lock, self.cache:
+            self.cache.execute("INSERT OR REPLACE INTO summaries VALUES (?, ?, ?)", (key, text, time.time() + self.ttl))
+
+# ------------------ Dump Import ------------------
+def open_dump(path):
+    if path.endswith(".gz"): return gzip.open(path, "rb")
+    if path.endswith(".bz2"): return bz2.open(path, "rb")
+    return open(path, "rb")
+
+def iter_abstracts(path):
+    """Streams (title, abstract) pairs from an enwiki-*-abstract.xml dump without loading it. Finished <doc>
+    elements are cleared off the root too, or the tree would still grow with the dump."""
+    with open_dump(path) as f:
+        events = ET.iterparse(f, events=("start", "end"))
+        _, root = next(events)
+        for event, element in events:
+            if event != "end" or element.tag != "doc": continue
+            title = (element.findtext("title") or "").removeprefix("Wikipedia: ")
+            abstract = (element.findtext("abstract") or "").strip()
+            if title and abstract and not abstract.startswith(("|", "{")): yield title, abstract
+            root.clear()
+
+def import_dump(source, target=DUMP_PATH):
+    """Builds the offline title index: abstracts(title_key PRIMARY KEY, title, abstract)."""
+    os.makedirs(os.path.dirname(target) or ".", exist_ok=True)
+    db = sqlite3.connect(target)
+    db.execute("CREATE TABLE IF NOT EXISTS abstracts (title_key TEXT PRIMARY KEY, title TEXT, abstract TEXT)")
+    batch, count = [], 0
+    for title, abstract in iter_abstracts(source):
+        batch.append((normalize_title(title), title, abstract))
+        if len(batch) >= IMPORT_BATCH:
+            with db: db.executemany("INSERT OR REPLACE INTO abstracts VALUES (?, ?, ?)", batch)
+            count += len(batch)
+            batch.clear()
+            print(f"\r📚 Imported {count}", end="", flush=True)
+    with db: db.executemany("INSERT OR REPLACE INTO abstracts VALUES (?, ?, ?)", batch)
+    db.close()
+    return count + len(batch)
+
+provider = None
+
+def summary(query, sentences=2):
+    global provider
+    if provider is None: provider = WikipediaProvider()
+    return provider.summary(query, sentences)
+
+# ------------------ CLI ------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Friday Wikipedia tools")
+    commands = parser.add_subparsers(dest="command", required=True)
+    imports = commands.add_parser("import", help="import an enwiki abstract dump (.xml, .xml.gz or .xml.bz2)")
+    imports.add_argument("dump")
+    imports.add_argument("--target", default=DUMP_PATH)
+    lookup = commands.add_parser("lookup", help="look up a summary through the cache and dump")
+    lookup.add_argument("query")
+    args = parser.parse_args()
+
+    if args.command == "import":
+        print(f"\n✅ Imported {import_dump(args.dump, args.target)} abstracts into {args.target}.")
+    elif args.command == "lookup":
+        start = time.perf_counter()
+        print(summary(args.query) or "No summary found.")
+        print(f"ℹ️ {(time.perf_counter() - start) * 1000:.1f} ms")